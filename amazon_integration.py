@@ -4,13 +4,65 @@ Amazon Integration - Parse Amazon emails and match to YNAB transactions
 
 import re
 import html
-from typing import Dict, List, Optional
-from datetime import datetime
+from email.utils import parsedate_to_datetime
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, date, timedelta
 from bs4 import BeautifulSoup
 
+# Prefer the C-backed lxml parser; fall back to the pure-Python parser if lxml isn't installed
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+# Precompiled patterns used by parse_email
+_ORDER_NUM_RE = re.compile(r'(\d{3}-\d{7}-\d{7})')
+_TOTAL_RE = re.compile(r'(?:Order\s+Total|Grand\s+Total)[:\s]*\$?([\d,]+\.\d{2})', re.IGNORECASE)
+_ANY_TOTAL_RE = re.compile(r'(Order\s+Total|Grand\s+Total|Total)[:\s]*\$?([\d,]+\.\d{2})', re.IGNORECASE)
+_DOLLAR_RE = re.compile(r'\$(\d+\.\d{2})')
+_FWD_DATE_RE = re.compile(r'Date:\s+[A-Za-z]+,\s+([A-Za-z]+)\s+(\d+),\s+(\d{4})')
+_HREF_ORDER_RE = re.compile(r'order-details|orderID=')
+_HREF_DP_RE = re.compile(r'/dp/[A-Z0-9]+')
+# UI link text to skip when collecting item names (anchored at the start via .match)
+_ITEM_SKIP_RE = re.compile(r'Order\s*#|View\s+order|View\s+or\s+edit\s+order|Track\s+package|See\s+all', re.IGNORECASE)
+
+# Precompiled patterns used by the order section and return helpers
+_SECTION_ORDER_RE = re.compile(r'Order #[^\d]*(\d{3}-\d{7}-\d{7})')
+_SECTION_TOTAL_RE = re.compile(r'Grand Total:\s*\$?([0-9,]+\.\d{2})')
+_SECTION_ITEM_RE = re.compile(r'([A-Z][^\n]{10,200}?)\s+Quantity:')
+_VIEW_ORDER_PREFIX_RE = re.compile(r'^.*?(?:View\s+(?:or\s+edit\s+)?order)\s*', re.IGNORECASE)
+_RETURN_ITEMS_RE = re.compile(r'Item\(s\)\s+in\s+your\s+return\s+request\s+(.*?)(?:Quantity:|Whole\s+Foods\s+Return)', re.IGNORECASE | re.DOTALL)
+_WHITESPACE_RE = re.compile(r'\s+')
+_RETURN_SUBJECT_RE = re.compile(r'(?:return request confirmed for|return drop off confirmation for|your refund for)\s+(.+)', re.IGNORECASE)
+_RETURN_SUBJECT_PHRASES = ('return request confirmed for', 'return drop off confirmation for', 'your refund for')
+
+# Month abbreviations for the forwarded-header date ("Nov 28, 2025"), parsed without strptime
+_MONTHS = {name: num for num, name in enumerate(
+    ('jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'), 1)}
+
+_AMZ_ORDER_URL_PREFIX = 'https://www.amazon.com/gp/your-account/order-details?orderID='
+# Start of any HTML tag, comment/doctype, or closing tag (used to tell HTML bodies from plain text)
+_HTML_TAG_RE = re.compile(r'<[A-Za-z!/]')
+
+
+def _looks_like_html(body: str) -> bool:
+    """Check whether an email body is HTML (any tag, including void tags like <br>) rather than plain text"""
+    return _HTML_TAG_RE.search(body) is not None
+
+
+def _as_date(value) -> date:
+    """Convert a YNAB transaction date (YYYY-MM-DD string or date) to a date object"""
+    if isinstance(value, str):
+        # fromisoformat is a C fast path for YYYY-MM-DD (much faster than strptime)
+        return date.fromisoformat(value)
+    return value
+
 
 class AmazonIntegration:
-    def __init__(self, ynab_client, email_client, user_detector=None, date_buffer_days=1, dry_run=False, category_classifier=None):
+    def __init__(self, ynab_client, email_client, user_detector=None, date_buffer_days=1, dry_run=False, category_classifier=None, debug=False, parse_workers=1, verbose=True):
         """
         Initialize Amazon integration
 
@@ -21,6 +73,10 @@ class AmazonIntegration:
             date_buffer_days: Number of days +/- to search for matching transactions (default: 1)
             dry_run: If True, don't make any modifications (default: False)
             category_classifier: CategoryClassifier instance for automatic categorization (optional)
+            debug: If True, print diagnostic order number/total scans while parsing (default: False)
+            parse_workers: Number of threads used to parse emails concurrently (default: 1 = serial).
+                           Parse output from different emails may interleave when > 1.
+            verbose: If True, print per-transaction details while matching (default: True)
         """
         self.ynab_client = ynab_client
         self.email_client = email_client
@@ -28,6 +84,9 @@ class AmazonIntegration:
         self.date_buffer_days = date_buffer_days
         self.dry_run = dry_run
         self.category_classifier = category_classifier
+        self.debug = debug
+        self.parse_workers = parse_workers
+        self.verbose = verbose
 
         # Track classification statistics
         self.classification_stats = {
@@ -51,27 +110,17 @@ class AmazonIntegration:
         Returns:
             Extracted item name with HTML entities decoded, or None
         """
-        # Strip forwarding prefix
-        clean_subject = re.sub(r'^Fwd:\s*', '', subject, flags=re.IGNORECASE)
+        # Most subjects are not returns: cheap literal check before running any regex
+        subject_lower = subject.lower()
+        if not any(phrase in subject_lower for phrase in _RETURN_SUBJECT_PHRASES):
+            return None
 
-        # Try pattern 1: "Return request confirmed for ..."
-        match = re.search(r'return request confirmed for\s+(.+)', clean_subject, re.IGNORECASE)
-        if match:
-            item_name = match.group(1).strip()
-            # Decode HTML entities (&amp, &quot, etc.)
-            item_name = html.unescape(item_name)
-            return item_name
+        # Strip forwarding prefix (literal, case-insensitive)
+        clean_subject = subject[4:].lstrip() if subject_lower.startswith('fwd:') else subject
 
-        # Try pattern 2: "Your return drop off confirmation for ..."
-        match = re.search(r'return drop off confirmation for\s+(.+)', clean_subject, re.IGNORECASE)
-        if match:
-            item_name = match.group(1).strip()
-            # Decode HTML entities (&amp, &quot, etc.)
-            item_name = html.unescape(item_name)
-            return item_name
-
-        # Try pattern 3: "Your refund for ..."
-        match = re.search(r'your refund for\s+(.+)', clean_subject, re.IGNORECASE)
+        # All three patterns in one scan: "Return request confirmed for ...",
+        # "Your return drop off confirmation for ...", "Your refund for ..."
+        match = _RETURN_SUBJECT_RE.search(clean_subject)
         if match:
             item_name = match.group(1).strip()
             # Decode HTML entities (&amp, &quot, etc.)
@@ -80,7 +129,7 @@ class AmazonIntegration:
 
         return None
 
-    def _extract_return_items_from_body(self, body: str, soup: BeautifulSoup) -> List[str]:
+    def _extract_return_items_from_body(self, text: str) -> List[str]:
         """
         Extract item names from return email body.
 
@@ -88,24 +137,20 @@ class AmazonIntegration:
         "Item(s) in your return request      <ITEM_NAME>...      <ITEM_NAME>..."
 
         Args:
-            body: Email body HTML
-            soup: BeautifulSoup parsed body
+            text: Email body text (HTML already stripped)
 
         Returns:
             List of item names extracted from the return email
         """
-        text = soup.get_text()
-
         # Look for "Item(s) in your return request" followed by product names
         # The items section ends at "Quantity:" which comes after the item name
-        pattern = r'Item\(s\)\s+in\s+your\s+return\s+request\s+(.*?)(?:Quantity:|Whole\s+Foods\s+Return)'
-        match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
+        match = _RETURN_ITEMS_RE.search(text)
 
         if match:
             items_section = match.group(1)
 
             # Clean up excessive whitespace to single spaces
-            items_text = re.sub(r'\s+', ' ', items_section).strip()
+            items_text = _WHITESPACE_RE.sub(' ', items_section).strip()
 
             # The item name is typically the entire text here
             # Return emails usually have one item per return request
@@ -116,14 +161,13 @@ class AmazonIntegration:
 
         return []
 
-    def _parse_order_sections(self, body: str, soup: BeautifulSoup) -> List[Dict]:
+    def _parse_order_sections(self, text: str) -> List[Dict]:
         """
         Parse multiple order sections from a single email.
         Some Amazon emails contain multiple orders bundled together.
 
         Args:
-            body: Email body HTML
-            soup: BeautifulSoup parsed body
+            text: Email body text (HTML already stripped)
 
         Returns:
             List of order section dicts, each containing:
@@ -131,16 +175,11 @@ class AmazonIntegration:
             - amount: Grand Total
             - first_item: First item name in that order section
         """
-        # Extract text for easier pattern matching
-        text = soup.get_text()
-
         # Find all order numbers and their positions
-        order_pattern = r'Order #[^\d]*(\d{3}-\d{7}-\d{7})'
-        order_matches = [(m.group(1), m.start()) for m in re.finditer(order_pattern, text)]
+        order_matches = [(m.group(1), m.start()) for m in _SECTION_ORDER_RE.finditer(text)]
 
         # Find all Grand Totals and their positions
-        total_pattern = r'Grand Total:\s*\$?([0-9,]+\.\d{2})'
-        total_matches = [(m.group(1), m.start()) for m in re.finditer(total_pattern, text)]
+        total_matches = [(m.group(1), m.start()) for m in _SECTION_TOTAL_RE.finditer(text)]
 
         if not order_matches or not total_matches:
             return []
@@ -148,32 +187,33 @@ class AmazonIntegration:
         # Match each order to its Grand Total (the next one after it)
         # Use a dict to deduplicate by order number
         orders_dict = {}
+        # Both match lists are in position order, so one cursor walks the totals (linear merge)
+        total_idx = 0
         for order_num, order_pos in order_matches:
             # Skip if we already processed this order number
             if order_num in orders_dict:
                 continue
 
             # Find the next Grand Total after this order
+            while total_idx < len(total_matches) and total_matches[total_idx][1] <= order_pos:
+                total_idx += 1
             matching_total = None
-            for total_amount, total_pos in total_matches:
-                if total_pos > order_pos:
-                    matching_total = total_amount
-                    break
+            if total_idx < len(total_matches):
+                matching_total, total_pos = total_matches[total_idx]
 
             if matching_total:
                 # Extract ALL items from this order section
                 # Look for text between this order and the next order (or Grand Total)
                 section_end = total_pos + 100  # Some buffer after Grand Total
-                section_text = text[order_pos:section_end]
 
                 # Extract ALL item names - look for patterns like "Item Name ... Quantity: N"
-                # Find all matches, not just the first one
-                item_matches = re.finditer(r'([A-Z][^\n]{10,200}?)\s+Quantity:', section_text)
+                # Find all matches, not just the first one (scan the section in place, no slice copy)
+                item_matches = _SECTION_ITEM_RE.finditer(text, order_pos, section_end)
                 section_items = []
                 for item_match in item_matches:
                     item_text = item_match.group(1).strip()
                     # Remove all prefixes up to and including "View or edit order" or "View order"
-                    item_text = re.sub(r'^.*?(?:View\s+(?:or\s+edit\s+)?order)\s*', '', item_text, flags=re.IGNORECASE)
+                    item_text = _VIEW_ORDER_PREFIX_RE.sub('', item_text, count=1)
                     item_text = item_text.strip()
                     if item_text:
                         section_items.append(item_text)
@@ -201,42 +241,67 @@ class AmazonIntegration:
         """
         try:
             body = email_dict['body']
-            soup = BeautifulSoup(body, 'html.parser')
             subject = email_dict['subject']
 
+            # Cheap regex scans first (string ops > regex > HTML parsing)
+            order_match = _ORDER_NUM_RE.search(body)
+            total_match = _TOTAL_RE.search(body)
+            # Dollar amounts are only needed as a fallback when there's no Order/Grand Total
+            all_amounts = _DOLLAR_RE.findall(body) if not total_match else []
+
+            if self.debug:
+                # Debug: Print more of body to see order details
+                print(f"\n  DEBUG: Searching for order number and total...")
+                # Show context around the order number (reuses the single order number scan)
+                if order_match:
+                    context = body[max(0, order_match.start() - 50):order_match.end()]
+                    print(f"  Found order pattern: {context}")
+                # Look for any total label in a single pass
+                total_search = _ANY_TOTAL_RE.search(body)
+                if total_search:
+                    print(f"  Found total with label '{total_search.group(1)}': ${total_search.group(2)}")
+                else:
+                    # Show all dollar amounts found
+                    print(f"  Total not found. All dollar amounts in email: {all_amounts[:10]}")
+
+            # Nothing to build a transaction from (no order number, total or dollar amount):
+            # bail out before any HTML parsing
+            if not order_match and not total_match and not all_amounts:
+                return []
+
+            # Detect if this is a return transaction
+            # Check for both 'return' and 'refund' keywords
+            subject_lower = subject.lower()
+            is_return = 'return' in subject_lower or 'refund' in subject_lower
+
+            # Only build the HTML tree when the body contains something we read from it:
+            # order sections ("Order #" ... "Grand Total:"), /dp/ item links, an order-details
+            # link (needed when there's no order number), or return item text
+            needs_soup = (
+                ('Order' in body and 'Total' in body)
+                or '/dp/' in body
+                or (not order_match and _HREF_ORDER_RE.search(body) is not None)
+                or is_return
+            )
+            if not _looks_like_html(body):
+                # Plain-text body (e.g. forwarded without HTML): no anchors to read,
+                # so skip the HTML parser and run the text regexes on the body directly
+                soup = None
+                text = body
+            elif needs_soup:
+                soup = BeautifulSoup(body, HTML_PARSER)
+                text = soup.get_text()
+            else:
+                soup = None
+                text = ''
+
             # Try to parse multiple orders first
-            order_sections = self._parse_order_sections(body, soup)
+            order_sections = self._parse_order_sections(text) if text else []
 
             if len(order_sections) > 1:
                 print(f"\n  Found {len(order_sections)} orders in this email")
 
-            # Debug: Print more of body to see order details
-            print(f"\n  DEBUG: Searching for order number and total...")
-            # Look for order number
-            order_search = re.search(r'(Order.{0,50}\d{3}-\d{7}-\d{7})', body, re.IGNORECASE | re.DOTALL)
-            if order_search:
-                print(f"  Found order pattern: {order_search.group(1)[:100]}")
-            # Look for various total patterns
-            total_patterns = [
-                r'Order Total[:\s]*\$?([\d,]+\.\d{2})',
-                r'Grand Total[:\s]*\$?([\d,]+\.\d{2})',
-                r'Total[:\s]*\$?([\d,]+\.\d{2})',
-            ]
-            found_total = False
-            for pattern in total_patterns:
-                total_search = re.search(pattern, body, re.IGNORECASE)
-                if total_search:
-                    print(f"  Found total with pattern '{pattern}': ${total_search.group(1)}")
-                    found_total = True
-                    break
-
-            if not found_total:
-                # Show all dollar amounts found
-                dollar_amounts = re.findall(r'\$(\d+\.\d{2})', body)
-                print(f"  Total not found. All dollar amounts in email: {dollar_amounts[:10]}")
-
             # Extract order number (handle HTML entities and special chars)
-            order_match = re.search(r'(\d{3}-\d{7}-\d{7})', body)
             order_number = order_match.group(1) if order_match else None
             if order_number:
                 print(f"  Extracted order number: {order_number}")
@@ -245,12 +310,12 @@ class AmazonIntegration:
             order_details_url = None
             if order_number:
                 # Construct Amazon order details URL
-                order_details_url = f"https://www.amazon.com/gp/your-account/order-details?orderID={order_number}"
+                order_details_url = _AMZ_ORDER_URL_PREFIX + order_number
 
             # Also try to find the link in the email
-            if not order_details_url:
+            if not order_details_url and soup:
                 # Look for "Order details" or "View order" links
-                order_link = soup.find('a', href=re.compile(r'order-details|orderID='))
+                order_link = soup.find('a', href=_HREF_ORDER_RE)
                 if order_link and order_link.get('href'):
                     href = order_link.get('href')
                     # Make sure it's a full URL
@@ -259,13 +324,9 @@ class AmazonIntegration:
                     elif href.startswith('/'):
                         order_details_url = f"https://www.amazon.com{href}"
 
-            # Extract total amount
-            # Try to find "Order Total" first
-            total_match = re.search(r'(?:Order\s+Total|Grand\s+Total)[:\s]*\$?([\d,]+\.\d{2})', body, re.IGNORECASE)
-
+            # Extract total amount ("Order Total" / "Grand Total" searched above)
             if not total_match:
                 # Fallback: Use the first dollar amount found (usually the order total in forwarded emails)
-                all_amounts = re.findall(r'\$(\d+\.\d{2})', body)
                 if all_amounts:
                     # The first amount is typically the order total
                     total_match_str = all_amounts[0]
@@ -279,62 +340,49 @@ class AmazonIntegration:
             # Extract order date from email
             # For forwarded emails, try to extract original date from forwarding header
             order_date = None
-            fwd_date_match = re.search(r'Date:\s+[A-Za-z]+,\s+([A-Za-z]+\s+\d+,\s+\d{4})', body)
+            fwd_date_match = _FWD_DATE_RE.search(body)
             if fwd_date_match:
-                try:
-                    # Parse "Nov 28, 2025" format
-                    date_str = fwd_date_match.group(1)
-                    order_date = datetime.strptime(date_str, '%b %d, %Y')
-                    print(f"  Extracted order date from forwarded header: {order_date.strftime('%Y-%m-%d')}")
-                except:
-                    pass
+                # Parse "Nov 28, 2025" format
+                month_name, day, year = fwd_date_match.groups()
+                month = _MONTHS.get(month_name.lower())
+                if month:
+                    try:
+                        order_date = datetime(int(year), month, int(day))
+                        print(f"  Extracted order date from forwarded header: {order_date.strftime('%Y-%m-%d')}")
+                    except ValueError:
+                        pass
 
             # Fallback to email date if we couldn't parse forwarded date
             if not order_date:
+                # Parse format: "Tue, 9 Dec 2025 06:50:15 +0000" (keep the sender's wall-clock time, drop timezone)
                 try:
-                    date_str = email_dict['date']
-                    # Parse format: "Tue, 9 Dec 2025 06:50:15 +0000"
-                    # Remove day name and timezone
-                    date_part = date_str.split(',')[1].strip()  # "9 Dec 2025 06:50:15 +0000"
-                    date_without_tz = date_part.rsplit(' ', 1)[0]  # Remove timezone: "9 Dec 2025 06:50:15"
-                    order_date = datetime.strptime(date_without_tz, '%d %b %Y %H:%M:%S')
-                except:
+                    order_date = parsedate_to_datetime(email_dict['date']).replace(tzinfo=None)
+                except (KeyError, TypeError, ValueError):
                     order_date = datetime.now()
 
             # Extract items (basic extraction - Amazon emails vary)
             items = []
             # Look for product names in the email
-            item_matches = soup.find_all('a', href=re.compile(r'/dp/[A-Z0-9]+'))
+            item_matches = soup.find_all('a', href=_HREF_DP_RE) if soup else []
             for item in item_matches:  # No limit - get all items
                 item_text = item.get_text(strip=True)
                 # Filter out UI text and common patterns
                 if item_text and len(item_text) > 10:
                     # Skip if it's mostly UI text
-                    skip_patterns = [
-                        r'^Order\s*#',
-                        r'^View\s+order',
-                        r'^View\s+or\s+edit\s+order',
-                        r'^Track\s+package',
-                        r'^See\s+all',
-                    ]
-                    if any(re.match(pattern, item_text, re.IGNORECASE) for pattern in skip_patterns):
+                    if _ITEM_SKIP_RE.match(item_text):
                         continue
                     items.append(item_text)
 
-            # Detect if this is a return transaction
-            # Check for both 'return' and 'refund' keywords
-            is_return = 'return' in subject.lower() or 'refund' in subject.lower()
-
             # For return emails, extract items from the body (different HTML structure than order emails)
             if is_return and not items:
-                items = self._extract_return_items_from_body(body, soup)
+                items = self._extract_return_items_from_body(text)
                 print(f"  Extracted {len(items)} return items from body")
 
             # Use order_sections if found (handles both single and multi-order cases)
             if order_sections:
                 transactions = []
                 for section in order_sections:
-                    order_details_url = f"https://www.amazon.com/gp/your-account/order-details?orderID={section['order_number']}"
+                    order_details_url = _AMZ_ORDER_URL_PREFIX + section['order_number']
 
                     # Use items extracted from this specific order section
                     # If section has its own items, use those; otherwise use general items from email
@@ -385,14 +433,32 @@ class AmazonIntegration:
             print(f"Error parsing Amazon email: {e}")
             return []
 
-    def match_to_ynab(self, amazon_txn: dict, ynab_transactions: list) -> Optional[dict]:
+    def _index_ynab_transactions(self, ynab_parsed: List[Tuple]) -> Dict[Tuple, List[Tuple]]:
+        """
+        Index YNAB transactions by (date, amount in milliunits) for match_to_ynab
+        Only transactions whose payee contains "Amazon" are indexed, since nothing else can match.
+
+        Args:
+            ynab_parsed: List of (YNAB transaction, parsed date) tuples
+
+        Returns:
+            Dict mapping (date, amount) -> list of (position in YNAB list, transaction)
+        """
+        index = defaultdict(list)
+        for position, (ynab_txn, ynab_date) in enumerate(ynab_parsed):
+            # Lowercase each payee once per batch rather than once per match attempt
+            if 'amazon' in (ynab_txn.payee_name or '').lower():
+                index[(ynab_date, ynab_txn.amount)].append((position, ynab_txn))
+        return index
+
+    def match_to_ynab(self, amazon_txn: dict, ynab_index: Dict[Tuple, List[Tuple]]) -> Optional[dict]:
         """
         Find matching YNAB transaction for an Amazon email transaction
         Handles both purchases (negative/outflow) and returns (positive/inflow)
 
         Args:
-            amazon_txn: Amazon transaction from email
-            ynab_transactions: List of YNAB transactions
+            amazon_txn: Amazon transaction from email (with 'account_id' resolved by process_email_batch)
+            ynab_index: (date, amount) index from _index_ynab_transactions, built once per batch
 
         Returns:
             Matching YNAB transaction or None
@@ -405,46 +471,29 @@ class AmazonIntegration:
         if amazon_amount is None:
             return None
 
-        # Get the account ID for the Amazon card this transaction should be on
-        target_account_id = None
-        if amazon_txn.get('account_name'):
-            accounts = self.ynab_client.get_accounts()
-            for account in accounts:
-                if account.name == amazon_txn['account_name']:
-                    target_account_id = account.id
-                    break
+        # Account ID for the Amazon card this transaction should be on (resolved once per batch)
+        target_account_id = amazon_txn.get('account_id')
 
         # Convert to YNAB milliunits
         # Returns are positive (inflow), purchases are negative (outflow)
         if is_return:
-            amazon_amount_milliunits = int(amazon_amount * 1000)  # Positive for inflow
+            amazon_amount_milliunits = round(amazon_amount * 1000)  # Positive for inflow
         else:
-            amazon_amount_milliunits = int(-amazon_amount * 1000)  # Negative for outflow
+            amazon_amount_milliunits = round(-amazon_amount * 1000)  # Negative for outflow
+
+        # Look up transactions with the same amount on each day within the configured tolerance
+        candidates = []
+        for delta in range(-self.date_buffer_days, self.date_buffer_days + 1):
+            candidates.extend(ynab_index.get((amazon_date + timedelta(days=delta), amazon_amount_milliunits), []))
 
-        for ynab_txn in ynab_transactions:
+        # Keep YNAB list order so the first eligible transaction wins
+        # (payee already known to contain "Amazon" from the index)
+        for _, ynab_txn in sorted(candidates, key=lambda candidate: candidate[0]):
             # If we have a target account, only match transactions on that account
             if target_account_id and ynab_txn.account_id != target_account_id:
                 continue
 
-            # Parse YNAB transaction date (convert from string to date object)
-            if isinstance(ynab_txn.date, str):
-                ynab_date = datetime.strptime(ynab_txn.date, '%Y-%m-%d').date()
-            else:
-                ynab_date = ynab_txn.date
-
-            # Check if dates match (within configured day tolerance)
-            date_diff = abs((amazon_date - ynab_date).days)
-            if date_diff > self.date_buffer_days:
-                continue
-
-            # Check if amount matches (YNAB stores in milliunits)
-            if ynab_txn.amount != amazon_amount_milliunits:
-                continue
-
-            # Check if payee contains "Amazon"
-            payee_name = ynab_txn.payee_name or ""
-            if "amazon" in payee_name.lower():
-                return ynab_txn
+            return ynab_txn
 
         return None
 
@@ -512,8 +561,10 @@ class AmazonIntegration:
         """
         matches = []
         amazon_transactions = []
+        matched_email_ids = []  # Labeled 'matched' in one batch after the loop
 
-        # Parse each email (can return multiple transactions per email)
+        # Detect the user for each email first (cheap, serial so output stays ordered)
+        emails_to_parse = []
         for email_dict in emails:
             # Detect which user this email belongs to
             user = None
@@ -533,7 +584,17 @@ class AmazonIntegration:
                 # Fallback: assume Cong if no user detector provided (backwards compatibility)
                 user = 'cong'
 
-            parsed_list = self.parse_email(email_dict)
+            emails_to_parse.append((email_dict, user))
+
+        # Parse each email (can return multiple transactions per email)
+        # Parsing is independent per email, so it can run on a thread pool; map() keeps input order
+        if self.parse_workers > 1 and len(emails_to_parse) > 1:
+            with ThreadPoolExecutor(max_workers=min(self.parse_workers, len(emails_to_parse))) as executor:
+                parsed_lists = list(executor.map(self.parse_email, [email_dict for email_dict, _ in emails_to_parse]))
+        else:
+            parsed_lists = [self.parse_email(email_dict) for email_dict, _ in emails_to_parse]
+
+        for (email_dict, user), parsed_list in zip(emails_to_parse, parsed_lists):
             if parsed_list:
                 # Add user info to each parsed transaction
                 for txn in parsed_list:
@@ -553,46 +614,76 @@ class AmazonIntegration:
 
         print(f"\n=== Amazon Email Transactions ({len(amazon_transactions)}) ===\n")
 
+        # Resolve account names to IDs with a single accounts API call
+        account_ids = {}
+        if any(txn.get('account_name') for txn in amazon_transactions):
+            for account in self.ynab_client.get_accounts():
+                account_ids.setdefault(account.name, account.id)  # First account with a name wins
+        for txn in amazon_transactions:
+            txn['account_id'] = account_ids.get(txn.get('account_name'))
+
+        # Parse each YNAB date once per batch instead of once per Amazon transaction
+        ynab_parsed = [(t, _as_date(t.date)) for t in ynab_transactions]
+        ynab_by_date = defaultdict(list)
+        if self.verbose:
+            for t, ynab_date in ynab_parsed:
+                ynab_by_date[ynab_date].append(t)
+        ynab_index = self._index_ynab_transactions(ynab_parsed)
+
         # Match each Amazon transaction to YNAB
+        verbose = self.verbose
+        dry_run = self.dry_run
+        classifier = self.category_classifier
+        # Classification method label only depends on the rules, so compute it once per batch
+        if classifier:
+            force_llm = 'amazon' in classifier.force_llm_sources
+            method = "LLM" if force_llm else "Rules/LLM"
+
         for idx, txn in enumerate(amazon_transactions, 1):
-            date_str = txn['date'].strftime('%Y-%m-%d')
-            amount_str = f"${txn['amount']:.2f}" if txn['amount'] else "N/A"
             is_return = txn.get('is_return', False)
+            amount = txn['amount']
+            items = txn.get('items')
+            user = txn.get('user')
+            account_name = txn.get('account_name')
 
-            user_label = f"[{txn['user'].upper()}]" if txn.get('user') else ""
-            account_label = f"({txn['account_name']})" if txn.get('account_name') else ""
+            user_label = f"[{user.upper()}]" if user else ""
+            account_label = f"({account_name})" if account_name else ""
             print(f"[{idx}] Amazon Email Transaction {'(RETURN)' if is_return else ''}: {user_label} {account_label}")
-            print(f"    Date: {date_str}")
-            print(f"    Amount: {amount_str}")
-            print(f"    Order: {txn['order_number']}")
-            if is_return:
-                print(f"    Type: RETURN (expecting positive/inflow in YNAB)")
-
-            # Show items if available
-            if txn.get('items'):
-                items_preview = ', '.join(txn['items'][:3])  # Show first 3 items
-                if len(txn['items']) > 3:
-                    items_preview += f" +{len(txn['items']) - 3} more"
-                print(f"    Items: {items_preview}")
+            if verbose:
+                date_str = txn['date'].date().isoformat()
+                amount_str = f"${amount:.2f}" if amount else "N/A"
+                print(f"    Date: {date_str}")
+                print(f"    Amount: {amount_str}")
+                print(f"    Order: {txn['order_number']}")
+                if is_return:
+                    print(f"    Type: RETURN (expecting positive/inflow in YNAB)")
+
+                # Show items if available
+                if items:
+                    items_preview = ', '.join(items[:3])  # Show first 3 items
+                    if len(items) > 3:
+                        items_preview += f" +{len(items) - 3} more"
+                    print(f"    Items: {items_preview}")
 
             # Try to match with YNAB transaction
-            ynab_match = self.match_to_ynab(txn, ynab_transactions)
+            ynab_match = self.match_to_ynab(txn, ynab_index)
 
             if ynab_match:
                 print(f"    ✓ MATCHED YNAB Transaction:")
-                print(f"      ID: {ynab_match.id}")
-                print(f"      Payee: {ynab_match.payee_name}")
-                print(f"      Amount: ${ynab_match.amount / 1000:.2f}")
-                print(f"      Current Memo: {ynab_match.memo or '(empty)'}")
-                print(f"      Approved: {'Yes' if ynab_match.approved else 'No'}")
-
-                # Show what the new memo would be
                 new_memo = self.format_memo(txn)
-                print(f"      Proposed Memo: {new_memo}")
+                if verbose:
+                    print(f"      ID: {ynab_match.id}")
+                    print(f"      Payee: {ynab_match.payee_name}")
+                    print(f"      Amount: ${ynab_match.amount / 1000:.2f}")
+                    print(f"      Current Memo: {ynab_match.memo or '(empty)'}")
+                    print(f"      Approved: {'Yes' if ynab_match.approved else 'No'}")
+
+                    # Show what the new memo would be
+                    print(f"      Proposed Memo: {new_memo}")
 
                 # Update YNAB transaction memo (does not approve)
                 update_success = False
-                if self.dry_run:
+                if dry_run:
                     print(f"      [DRY RUN] Would update YNAB transaction memo")
                     update_success = True  # Treat dry run as success for labeling purposes
                 else:
@@ -605,23 +696,20 @@ class AmazonIntegration:
                         print(f"      ✗ Failed to update YNAB transaction memo")
 
                 # Classify and update category if classifier is available
-                if self.category_classifier and ynab_match and update_success:
+                if classifier and update_success:
                     self.classification_stats['attempted'] += 1
 
                     # Extract item name for classification
-                    item_name = txn.get('item_name_from_subject') or (txn.get('items', [{}])[0] if txn.get('items') else None)
-                    print(f"      🤖 Attempting to classify: '{item_name}'...")
+                    if verbose:
+                        item_name = txn.get('item_name_from_subject') or (items[0] if items else None)
+                        print(f"      🤖 Attempting to classify: '{item_name}'...")
 
-                    category_id = self.category_classifier.classify_amazon_transaction(txn, ynab_match)
+                    category_id = classifier.classify_amazon_transaction(txn, ynab_match)
                     if category_id:
                         self.classification_stats['classified'] += 1
-                        category_name = self.category_classifier.get_category_name(category_id)
-
-                        # Show classification method
-                        force_llm = 'amazon' in [s.lower() for s in self.category_classifier.rules.get('llm', {}).get('force_llm_for', [])]
-                        method = "LLM" if force_llm else "Rules/LLM"
+                        category_name = classifier.get_category_name(category_id)
 
-                        if self.dry_run:
+                        if dry_run:
                             print(f"      [DRY RUN] Would set category: {category_name} ({method})")
                         else:
                             if self.ynab_client.update_transaction_category(ynab_match.id, category_id, ynab_match):
@@ -638,30 +726,38 @@ class AmazonIntegration:
                     'new_memo': new_memo,
                     'update_success': update_success
                 })
+            elif amount is None:
+                # match_to_ynab can never match without an amount; skip the diagnostics too
+                print(f"    ✗ No amount found in email, cannot match to YNAB")
             else:
                 print(f"    ✗ No matching YNAB transaction found")
-                # Debug: Show potential matches
-                amount_sign = '+' if is_return else '-'
-                amount_display = f"{amount_sign}${txn['amount']:.2f}" if txn['amount'] is not None else "N/A"
-                print(f"      Looking for: Date={txn['date'].date()} (±{self.date_buffer_days} days), Amount={amount_display}, Payee contains 'Amazon'")
-                # Show YNAB transactions on same date
-                same_date_txns = [t for t in ynab_transactions
-                                 if datetime.strptime(str(t.date), '%Y-%m-%d').date() == txn['date'].date()]
-                if same_date_txns:
-                    print(f"      Found {len(same_date_txns)} YNAB transaction(s) on {txn['date'].date()}:")
-                    for t in same_date_txns[:10]:  # Show up to 10
-                        print(f"        - {t.payee_name}: ${t.amount/1000:.2f}")
+                if verbose:
+                    # Debug: Show potential matches
+                    amount_sign = '+' if is_return else '-'
+                    amount_display = f"{amount_sign}${amount:.2f}"
+                    amazon_date = txn['date'].date()
+                    print(f"      Looking for: Date={amazon_date} (±{self.date_buffer_days} days), Amount={amount_display}, Payee contains 'Amazon'")
+                    # Show YNAB transactions on same date
+                    same_date_txns = ynab_by_date.get(amazon_date, [])
+                    if same_date_txns:
+                        print(f"      Found {len(same_date_txns)} YNAB transaction(s) on {amazon_date}:")
+                        for t in same_date_txns[:10]:  # Show up to 10
+                            print(f"        - {t.payee_name}: ${t.amount/1000:.2f}")
 
             # Label email only if successfully matched and updated
-            if self.dry_run:
+            if dry_run:
                 if ynab_match:
                     print(f"    [DRY RUN] Would mark email as matched")
             else:
                 # Mark as matched only if YNAB was successfully updated
-                if ynab_match and matches and matches[-1].get('update_success'):
-                    self.email_client.label_as_matched(txn['email_id'])
-                    print(f"    ✓ Marked email as matched (will retry until matched)")
+                if ynab_match and update_success:
+                    matched_email_ids.append(txn['email_id'])
 
             print()  # Empty line between transactions
 
+        # Apply the 'matched' label to all successfully updated emails in one IMAP round-trip
+        if matched_email_ids:
+            self.email_client.label_as_matched_batch(matched_email_ids)
+            print(f"  ✓ Marked {len(set(matched_email_ids))} email(s) as matched (unlabeled emails retry next run)")
+
         return matches
@@ -4,6 +4,7 @@ Category Classifier - Classify transactions using rules and LLM fallback
 
 import os
 import re
+import json
 import yaml
 from typing import Dict, List, Optional, Tuple
 from difflib import SequenceMatcher
@@ -16,6 +17,87 @@ try:
 except ImportError:
     ANTHROPIC_AVAILABLE = False
 
+# Optional Aho-Corasick keyword matching (falls back to the compiled regex if not installed)
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+def _clean_category_name(name: str) -> str:
+    """Remove emojis/punctuation and normalize case for category name comparison"""
+    return ''.join(char for char in name if char.isalnum() or char.isspace()).lower().strip()
+
+
+def _is_word_char(char: str) -> bool:
+    """Same notion of a word character as regex \\w"""
+    return char.isalnum() or char == '_'
+
+
+def _is_word_boundary(text: str, pos: int) -> bool:
+    """Whether regex \\b would match at pos in text"""
+    before = pos > 0 and _is_word_char(text[pos - 1])
+    after = pos < len(text) and _is_word_char(text[pos])
+    return before != after
+
+
+# Transactions sent to the LLM per request by classify_batch_with_llm
+LLM_BATCH_SIZE = 50
+
+# Instructions shared by the single and batch LLM prompts (the categories list is filled in once per classifier)
+_LLM_GUIDANCE = """Analyze the transaction description and determine the most appropriate category. Consider:
+- Product type (baby items, groceries, electronics, pet supplies, etc.)
+- Merchant type (restaurant, pharmacy, retailer, etc.)
+- Context clues in the description
+- Category group context (e.g., "Auto: Maintenance & Repairs" is for car maintenance, NOT home repairs)"""
+
+_LLM_SYSTEM_PROMPT = """You are a financial transaction categorizer. Given a transaction description, classify it into one of the available budget categories.
+
+Available categories (formatted as "Category Group: Category Name"):
+{categories_block}
+
+""" + _LLM_GUIDANCE + """
+
+Respond ONLY with a JSON object in this exact format:
+{{
+  "category": "exact category name from the list above (just the name part after the colon)",
+  "confidence": 0.XX (between 0.0 and 1.0, where 1.0 is completely certain),
+  "reasoning": "brief explanation"
+}}
+
+If you cannot confidently categorize (confidence < 0.8), respond with:
+{{
+  "category": null,
+  "confidence": 0.0,
+  "reasoning": "explanation of why it's unclear"
+}}"""
+
+_LLM_BATCH_SYSTEM_PROMPT = """You are a financial transaction categorizer. Given a numbered list of transaction descriptions, classify each one into one of the available budget categories.
+
+Available categories (formatted as "Category Group: Category Name"):
+{categories_block}
+
+""" + _LLM_GUIDANCE + """
+
+Respond ONLY with a JSON array containing one object per description, in this exact format:
+[
+  {{
+    "i": <number of the description>,
+    "category": "exact category name from the list above (just the name part after the colon)",
+    "confidence": 0.XX (between 0.0 and 1.0, where 1.0 is completely certain)
+  }}
+]
+
+If you cannot confidently categorize a description (confidence < 0.8), use "category": null and "confidence": 0.0 for it."""
+
+# Payee substrings that mark a food establishment (pet keywords are skipped for these)
+_FOOD_ESTABLISHMENT_WORDS = ('restaurant', 'cafe', 'bar', 'grill', 'kitchen', 'bistro')
+
+# Precompiled patterns used by _clean_text
+_AMAZON_LINK_RE = re.compile(r'Amazon Link:\s*https?://[^\s]+', re.IGNORECASE)
+_URL_RE = re.compile(r'https?://[^\s]+')
+_WHITESPACE_RE = re.compile(r'\s+')
+
 
 class CategoryClassifier:
     def __init__(self, ynab_client, config_path='category_rules.yaml'):
@@ -29,16 +111,43 @@ class CategoryClassifier:
         self.ynab_client = ynab_client
         self.config_path = config_path
         self.rules = self._load_rules()
+        # Sources (e.g. 'amazon', 'venmo') that go straight to the LLM, lowercased once
+        self.force_llm_sources = frozenset(source.lower() for source in self.rules.get('llm', {}).get('force_llm_for', []))
+        rules = self.rules.get('rules', [])
+        self.rules_matcher = self._compile_rules(rules)
+        # Pet category is skipped for food establishments (e.g., "Lazy Dog Restaurant")
+        self.food_rules_matcher = self._compile_rules([rule for rule in rules if rule.get('category') != "Mochi"])
+        # Texts shorter than every keyword, or sharing no first character with any keyword, can't match a rule
+        keywords = [keyword.lower() for rule in rules for keyword in rule.get('keywords', [])]
+        self.min_keyword_length = min((len(keyword) for keyword in keywords), default=0)
+        self.keyword_first_chars = frozenset(keyword[0] for keyword in keywords if keyword)
         self.category_cache = {}  # Cache: name -> YNAB category ID
         self.category_id_to_name = {}  # Cache: ID -> name
         self.category_with_group = {}  # Cache: ID -> {name, group}
+        self.category_clean_names = []  # Cache: [(emoji-stripped lowercase name, ID)] for fuzzy matching
+        self.category_clean_to_id = {}  # Cache: emoji-stripped lowercase name -> ID (first wins)
+        self.category_lookup_cache = {}  # Cache: rule/LLM category name -> YNAB ID (or None)
         self._initialize_category_cache()
 
+        # LLM prompts only depend on the categories: build them once. The category list lives in
+        # the system prompt, so each request only adds the transaction text.
+        categories_block = '\n'.join(
+            f"- {cat_info['group']}: {cat_info['name']}"
+            for cat_info in sorted(self.category_with_group.values(), key=lambda c: f"{c['group']}: {c['name']}")
+        )
+        self.llm_system_prompt = _LLM_SYSTEM_PROMPT.format(categories_block=categories_block) if categories_block else None
+        self.llm_batch_system_prompt = _LLM_BATCH_SYSTEM_PROMPT.format(categories_block=categories_block) if categories_block else None
+
+        # Result caches keyed by cleaned text (payees and items recur across transactions)
+        self.rules_result_cache = {}  # Cache: text -> (category_name, confidence) from keyword rules
+        self.llm_result_cache = {}  # Cache: text -> (category_name, confidence) from LLM (errors not cached)
+
         # Initialize LLM client if API key is available
         self.anthropic_client = None
-        if ANTHROPIC_AVAILABLE and os.getenv('ANTHROPIC_API_KEY'):
+        api_key = os.getenv('ANTHROPIC_API_KEY')
+        if ANTHROPIC_AVAILABLE and api_key:
             try:
-                self.anthropic_client = Anthropic(api_key=os.getenv('ANTHROPIC_API_KEY'))
+                self.anthropic_client = Anthropic(api_key=api_key)
             except Exception as e:
                 print(f"⚠ Could not initialize Anthropic client: {e}")
 
@@ -56,6 +165,56 @@ class CategoryClassifier:
             print(f"⚠ Error loading category rules: {e}")
             return {'rules': [], 'conservative': {'minimum_confidence': 0.75}}
 
+    def _compile_rules(self, rules: List[Dict]) -> Optional[Tuple[re.Pattern, List[Tuple[str, float]], Optional[object]]]:
+        """
+        Compile all keyword rules into one regex that scans the text in a single pass
+
+        Each rule becomes a zero-width lookahead group, so rules whose keywords overlap
+        can all be tried at every position. Groups are ordered by descending confidence
+        (file order breaks ties), so the lowest group number that matches anywhere is
+        the rule the old rule-by-rule loop would have picked.
+
+        If pyahocorasick is installed, the keywords are also built into an Aho-Corasick
+        automaton (keyword -> best rank), which finds every keyword in one linear pass
+        no matter how many rules there are.
+
+        Args:
+            rules: Rule dicts from the YAML 'rules' list
+
+        Returns:
+            (compiled pattern, [(category, confidence)] indexed by group number, automaton or None),
+            or None if no rules
+        """
+        ranked = []
+        for rule in rules:
+            keywords = rule.get('keywords', [])
+            confidence = rule.get('confidence', 0.9)
+            if not keywords or confidence <= 0.0:
+                continue  # Can never be selected as the best match
+
+            # Use regex word boundaries to match complete words only
+            # This prevents "mobil" from matching "Mobile" and "pet" from matching "Petite"
+            lowered = [keyword.lower() for keyword in keywords]
+            keyword_pattern = r'\b(?:' + '|'.join(re.escape(keyword) for keyword in lowered) + r')\b'
+            ranked.append((rule.get('category'), confidence, keyword_pattern, lowered))
+
+        if not ranked:
+            return None
+
+        ranked.sort(key=lambda rule: -rule[1])  # Stable: equal confidence keeps file order
+        pattern = re.compile('|'.join(f'(?=(?P<r{i}>{rule[2]}))' for i, rule in enumerate(ranked)))
+
+        automaton = None
+        if AHOCORASICK_AVAILABLE and all(keyword for rule in ranked for keyword in rule[3]):
+            automaton = ahocorasick.Automaton()
+            for rank, rule in enumerate(ranked):
+                for keyword in rule[3]:
+                    if keyword not in automaton:  # Keep the best (first) rank for shared keywords
+                        automaton.add_word(keyword, (rank, len(keyword)))
+            automaton.make_automaton()
+
+        return (pattern, [(category, confidence) for category, confidence, _, _ in ranked], automaton)
+
     def _initialize_category_cache(self):
         """Fetch YNAB categories and build name->ID, ID->name, and ID->{name,group} caches"""
         try:
@@ -72,6 +231,10 @@ class CategoryClassifier:
                                 'name': cat.name,
                                 'group': group.name
                             }
+                            # Emoji-stripped name for fuzzy matching, computed once
+                            clean_name = _clean_category_name(cat.name)
+                            self.category_clean_names.append((clean_name, cat.id))
+                            self.category_clean_to_id.setdefault(clean_name, cat.id)
         except Exception as e:
             print(f"⚠ Error fetching YNAB categories: {e}")
 
@@ -88,14 +251,18 @@ class CategoryClassifier:
         if not text:
             return ""
 
+        # Too short to hold a URL or collapsible whitespace
+        if len(text) < 3 or (len(text) < 4 and text.isalpha()):
+            return text.strip()
+
         # Remove Amazon order links (common in memos)
-        text = re.sub(r'Amazon Link:\s*https?://[^\s]+', '', text, flags=re.IGNORECASE)
+        text = _AMAZON_LINK_RE.sub('', text)
 
         # Remove other URLs
-        text = re.sub(r'https?://[^\s]+', '', text)
+        text = _URL_RE.sub('', text)
 
         # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text).strip()
+        text = _WHITESPACE_RE.sub(' ', text).strip()
 
         return text
 
@@ -154,8 +321,7 @@ class CategoryClassifier:
         amount = ynab_txn.amount if hasattr(ynab_txn, 'amount') else None
 
         # Check if LLM should be used first for this source
-        force_llm_sources = self.rules.get('llm', {}).get('force_llm_for', [])
-        use_llm_first = 'amazon' in [s.lower() for s in force_llm_sources]
+        use_llm_first = 'amazon' in self.force_llm_sources
 
         category_name = None
         confidence = 0.0
@@ -215,8 +381,7 @@ class CategoryClassifier:
         text = self._clean_text(text)
 
         # Check if LLM should be used first for this source
-        force_llm_sources = self.rules.get('llm', {}).get('force_llm_for', [])
-        use_llm_first = 'venmo' in [s.lower() for s in force_llm_sources]
+        use_llm_first = 'venmo' in self.force_llm_sources
 
         category_name = None
         confidence = 0.0
@@ -274,6 +439,60 @@ class CategoryClassifier:
             if confidence < min_confidence:
                 return None
 
+        return self._resolve_category(category_name, amount)
+
+    def classify_generic_transactions(self, transactions: List[Tuple[str, Optional[int]]]) -> List[Optional[str]]:
+        """
+        Classify many transactions at once (for bulk categorization)
+
+        Same result as calling classify_generic_transaction for each, but every rule miss
+        is sent to the LLM together via classify_batch_with_llm.
+
+        Args:
+            transactions: (text, amount in milliunits) pairs
+
+        Returns:
+            YNAB category_id or None for each transaction, in input order
+        """
+        min_confidence = self.rules.get('conservative', {}).get('minimum_confidence', 0.75)
+        classifications = [(None, 0.0)] * len(transactions)
+        cleaned_texts = [None] * len(transactions)
+        llm_indices = []
+
+        # Rule-based matching first
+        for i, (text, _) in enumerate(transactions):
+            if not text or not text.strip():
+                continue
+            cleaned_texts[i] = self._clean_text(text)
+            classifications[i] = self._match_rules(cleaned_texts[i])
+            if classifications[i][1] < min_confidence:
+                llm_indices.append(i)
+
+        # LLM fallback for rule misses, batched
+        if llm_indices:
+            llm_classifications = self.classify_batch_with_llm([cleaned_texts[i] for i in llm_indices])
+            for i, classification in zip(llm_indices, llm_classifications):
+                classifications[i] = classification
+
+        category_ids = []
+        for (category_name, confidence), (_, amount) in zip(classifications, transactions):
+            if confidence < min_confidence:
+                category_ids.append(None)
+            else:
+                category_ids.append(self._resolve_category(category_name, amount))
+        return category_ids
+
+    def _resolve_category(self, category_name: Optional[str], amount: Optional[int]) -> Optional[str]:
+        """
+        Validate a classified category against the amount direction and map it to a YNAB ID
+
+        Args:
+            category_name: Category name from rules or LLM
+            amount: Transaction amount in YNAB milliunits (None skips validation)
+
+        Returns:
+            YNAB category_id or None
+        """
         # Validate category against transaction type
         if not self._validate_category_for_amount(category_name, amount):
             return None
@@ -295,46 +514,64 @@ class CategoryClassifier:
         Returns:
             (category_name, confidence) or (None, 0.0)
         """
-        if not text:
+        if not text or len(text) < self.min_keyword_length:
             return (None, 0.0)
 
+        cached = self.rules_result_cache.get(text)
+        if cached is not None:
+            return cached
+
+        result = self._match_rules_uncached(text)
+        self.rules_result_cache[text] = result
+        return result
+
+    def _match_rules_uncached(self, text: str) -> Tuple[Optional[str], float]:
+        """
+        Run the keyword rules matcher on text (see _match_rules, which caches results)
+
+        Args:
+            text: Item name, payee, or memo text to classify
+
+        Returns:
+            (category_name, confidence) or (None, 0.0)
+        """
         text_lower = text.lower()
-        rules = self.rules.get('rules', [])
 
-        if not rules:
+        # No keyword can start anywhere in the text: skip the matcher entirely
+        if self.min_keyword_length and not any(char in self.keyword_first_chars for char in text_lower):
             return (None, 0.0)
 
         # Context-aware exclusions: skip certain categories based on context
         # If payee contains "restaurant", "cafe", "bar", don't match pet keywords
-        is_food_establishment = any(word in text_lower for word in ['restaurant', 'cafe', 'bar', 'grill', 'kitchen', 'bistro'])
-
-        # Find best matching rule
-        best_match = None
-        best_confidence = 0.0
+        is_food_establishment = any(word in text_lower for word in _FOOD_ESTABLISHMENT_WORDS)
+        matcher = self.food_rules_matcher if is_food_establishment else self.rules_matcher
 
-        for rule in rules:
-            category = rule.get('category')
-            keywords = rule.get('keywords', [])
-            rule_confidence = rule.get('confidence', 0.9)
-
-            # Skip pet category for food establishments (e.g., "Lazy Dog Restaurant")
-            if is_food_establishment and category == "Mochi":
-                continue
+        if not matcher:
+            return (None, 0.0)
 
-            # Check if any keyword matches (use word boundaries to avoid substring matches)
-            for keyword in keywords:
-                keyword_lower = keyword.lower()
-                # Use regex word boundaries to match complete words only
-                # This prevents "mobil" from matching "Mobile" and "pet" from matching "Petite"
-                pattern = r'\b' + re.escape(keyword_lower) + r'\b'
-                if re.search(pattern, text_lower):
-                    # Found a match
-                    if rule_confidence > best_confidence:
-                        best_match = category
-                        best_confidence = rule_confidence
-                    break  # Move to next rule once we found a match
-
-        return (best_match, best_confidence)
+        # Find best matching rule: lowest group number (highest confidence) matched anywhere
+        pattern, ranked, automaton = matcher
+        best_rank = None
+        if automaton is not None:
+            for end, (rank, length) in automaton.iter(text_lower):
+                if best_rank is not None and rank >= best_rank:
+                    continue
+                # Aho-Corasick ignores word boundaries; apply the same \b check as the regex
+                if _is_word_boundary(text_lower, end - length + 1) and _is_word_boundary(text_lower, end + 1):
+                    best_rank = rank
+                    if rank == 0:
+                        break  # Nothing can beat the top-ranked rule
+        else:
+            for match in pattern.finditer(text_lower):
+                rank = int(match.lastgroup[1:])
+                if best_rank is None or rank < best_rank:
+                    best_rank = rank
+                    if rank == 0:
+                        break  # Nothing can beat the top-ranked rule
+
+        if best_rank is None:
+            return (None, 0.0)
+        return ranked[best_rank]
 
     def _classify_with_llm(self, text: str) -> Tuple[Optional[str], float]:
         """
@@ -349,85 +586,121 @@ class CategoryClassifier:
         if not self.anthropic_client:
             return (None, 0.0)
 
-        try:
-            # Get available categories with groups for the prompt
-            categories_with_groups = []
-            for cat_id, cat_info in self.category_with_group.items():
-                categories_with_groups.append(f"{cat_info['group']}: {cat_info['name']}")
-
-            if not categories_with_groups:
-                return (None, 0.0)
-
-            # Build structured prompt
-            prompt = f"""You are a financial transaction categorizer. Given a transaction description, classify it into one of the available budget categories.
-
-Transaction description: "{text}"
-
-Available categories (formatted as "Category Group: Category Name"):
-{chr(10).join(f'- {cat}' for cat in sorted(categories_with_groups))}
-
-Analyze the transaction description and determine the most appropriate category. Consider:
-- Product type (baby items, groceries, electronics, pet supplies, etc.)
-- Merchant type (restaurant, pharmacy, retailer, etc.)
-- Context clues in the description
-- Category group context (e.g., "Auto: Maintenance & Repairs" is for car maintenance, NOT home repairs)
-
-Respond ONLY with a JSON object in this exact format:
-{{
-  "category": "exact category name from the list above (just the name part after the colon)",
-  "confidence": 0.XX (between 0.0 and 1.0, where 1.0 is completely certain),
-  "reasoning": "brief explanation"
-}}
+        # Identical text gets the same answer at temperature 0: skip the API call
+        cached = self.llm_result_cache.get(text)
+        if cached is not None:
+            return cached
 
-If you cannot confidently categorize (confidence < 0.8), respond with:
-{{
-  "category": null,
-  "confidence": 0.0,
-  "reasoning": "explanation of why it's unclear"
-}}"""
+        if not self.llm_system_prompt:
+            return (None, 0.0)
 
+        try:
             # Call Claude Haiku
             message = self.anthropic_client.messages.create(
                 model="claude-3-haiku-20240307",
                 max_tokens=200,
                 temperature=0.0,
-                messages=[{"role": "user", "content": prompt}]
+                system=self.llm_system_prompt,
+                messages=[{"role": "user", "content": f'Transaction description: "{text}"'}]
             )
 
             # Parse response
-            response_text = message.content[0].text.strip()
-
-            # Extract JSON from response (handle markdown code blocks)
-            import json
-            if '```json' in response_text:
-                json_text = response_text.split('```json')[1].split('```')[0].strip()
-            elif '```' in response_text:
-                json_text = response_text.split('```')[1].split('```')[0].strip()
-            else:
-                json_text = response_text
+            result = self._parse_llm_json(message.content[0].text)
+            classification = self._llm_result_to_classification(result)
+            self.llm_result_cache[text] = classification
+            return classification
+
+        except Exception as e:
+            print(f"    ⚠ LLM classification error: {e}")
+            return (None, 0.0)
+
+    def classify_batch_with_llm(self, texts: List[str]) -> List[Tuple[Optional[str], float]]:
+        """
+        Classify many transaction texts with one Claude Haiku call per LLM_BATCH_SIZE texts
+
+        Texts already in the LLM cache are not resent. If a batch response can't be parsed,
+        its texts fall back to one _classify_with_llm call each.
 
-            result = json.loads(json_text)
+        Args:
+            texts: Cleaned transaction texts (item names, payees, memos, etc.)
 
-            category = result.get('category')
-            confidence = float(result.get('confidence', 0.0))
+        Returns:
+            (category_name, confidence) or (None, 0.0) for each text, in input order
+        """
+        if not self.anthropic_client:
+            return [(None, 0.0)] * len(texts)
 
-            # Extract just the category name if LLM returned "Group: Category" format
-            # We want just "Category" for mapping to YNAB ID
-            if category and ':' in category:
-                # Split on last colon in case category name itself contains colons
-                category = category.split(':', 1)[1].strip()
+        if not self.llm_batch_system_prompt:
+            return [(None, 0.0)] * len(texts)
 
-            # Apply LLM confidence threshold
-            llm_threshold = self.rules.get('llm', {}).get('confidence_threshold', 0.8)
-            if confidence < llm_threshold:
-                return (None, 0.0)
+        # Unique texts not answered yet (duplicates are classified once)
+        pending = [text for text in dict.fromkeys(texts) if text not in self.llm_result_cache]
 
-            return (category, confidence)
+        for start in range(0, len(pending), LLM_BATCH_SIZE):
+            batch = pending[start:start + LLM_BATCH_SIZE]
+            numbered = '\n'.join(f'{i}. "{text}"' for i, text in enumerate(batch, 1))
 
-        except Exception as e:
-            print(f"    ⚠ LLM classification error: {e}")
+            try:
+                message = self.anthropic_client.messages.create(
+                    model="claude-3-haiku-20240307",
+                    max_tokens=100 + 60 * len(batch),
+                    temperature=0.0,
+                    system=self.llm_batch_system_prompt,
+                    messages=[{"role": "user", "content": f"Transaction descriptions:\n{numbered}"}]
+                )
+
+                results = self._parse_llm_json(message.content[0].text)
+                for result in results:
+                    index = int(result.get('i', 0)) - 1
+                    if 0 <= index < len(batch):
+                        self.llm_result_cache[batch[index]] = self._llm_result_to_classification(result)
+            except Exception as e:
+                print(f"    ⚠ LLM batch classification error: {e}, retrying individually")
+
+            # Anything the batch didn't answer is classified on its own
+            for text in batch:
+                if text not in self.llm_result_cache:
+                    self._classify_with_llm(text)
+
+        return [self.llm_result_cache.get(text, (None, 0.0)) for text in texts]
+
+    def _parse_llm_json(self, response_text: str):
+        """Extract and parse the JSON payload from an LLM response (handles markdown code blocks)"""
+        response_text = response_text.strip()
+        if '```json' in response_text:
+            json_text = response_text.split('```json')[1].split('```')[0].strip()
+        elif '```' in response_text:
+            json_text = response_text.split('```')[1].split('```')[0].strip()
+        else:
+            json_text = response_text
+        return json.loads(json_text)
+
+    def _llm_result_to_classification(self, result: Dict) -> Tuple[Optional[str], float]:
+        """
+        Convert one parsed LLM answer into (category_name, confidence)
+
+        Args:
+            result: Dict with 'category' and 'confidence' keys from the LLM
+
+        Returns:
+            (category_name, confidence), or (None, 0.0) if below the LLM confidence threshold
+        """
+        category = result.get('category')
+        confidence = float(result.get('confidence', 0.0))
+
+        # Extract just the category name if LLM returned "Group: Category" format
+        # We want just "Category" for mapping to YNAB ID
+        if category and ':' in category:
+            # Split on last colon in case category name itself contains colons
+            category = category.split(':', 1)[1].strip()
+
+        # Apply LLM confidence threshold
+        llm_threshold = self.rules.get('llm', {}).get('confidence_threshold', 0.8)
+        if confidence < llm_threshold:
             return (None, 0.0)
 
+        return (category, confidence)
+
     def _map_category_to_id(self, category_name: str) -> Optional[str]:
         """
         Map category name to YNAB ID with exact and fuzzy matching
@@ -445,22 +718,26 @@ If you cannot confidently categorize (confidence < 0.8), respond with:
         if category_name in self.category_cache:
             return self.category_cache[category_name]
 
-        # Try fuzzy matching (remove emojis and compare)
-        best_match = None
-        best_ratio = 0.0
+        # Same rule/LLM category names come up repeatedly
+        if category_name in self.category_lookup_cache:
+            return self.category_lookup_cache[category_name]
 
-        for ynab_name, ynab_id in self.category_cache.items():
-            # Remove emojis and compare
-            ynab_clean = ''.join(char for char in ynab_name if char.isalnum() or char.isspace())
-            rule_clean = ''.join(char for char in category_name if char.isalnum() or char.isspace())
+        # Remove emojis and compare (YNAB names were cleaned once when the cache was built)
+        rule_clean = _clean_category_name(category_name)
+        best_match = self.category_clean_to_id.get(rule_clean)
 
-            # Calculate similarity
-            ratio = SequenceMatcher(None, rule_clean.lower().strip(), ynab_clean.lower().strip()).ratio()
+        if not best_match:
+            # Try fuzzy matching
+            best_ratio = 0.0
+            for ynab_clean, ynab_id in self.category_clean_names:
+                # Calculate similarity
+                ratio = SequenceMatcher(None, rule_clean, ynab_clean).ratio()
 
-            if ratio > best_ratio and ratio > 0.8:  # 80% similarity threshold
-                best_match = ynab_id
-                best_ratio = ratio
+                if ratio > best_ratio and ratio > 0.8:  # 80% similarity threshold
+                    best_match = ynab_id
+                    best_ratio = ratio
 
+        self.category_lookup_cache[category_name] = best_match
         if best_match:
             return best_match
 
@@ -4,8 +4,16 @@ Email Client for generic email handling
 
 import imaplib
 import email
+import re
 from email.header import decode_header
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterator, Tuple
+
+# Default messages requested per IMAP FETCH (one round-trip per batch instead of per message)
+FETCH_BATCH_SIZE = 100
+
+# The X-GM-LABELS list in a FETCH response line, e.g. b'42 (X-GM-LABELS (\\Inbox matched))'
+# (quoted labels may contain parentheses)
+_LABELS_RE = re.compile(rb'X-GM-LABELS \(((?:"(?:[^"\\]|\\.)*"|[^")])*)\)')
 
 
 class EmailClient:
@@ -14,7 +22,9 @@ class EmailClient:
         email_address: str,
         app_password: str,
         imap_server: str = 'imap.gmail.com',
-        imap_port: int = 993
+        imap_port: int = 993,
+        debug: bool = False,
+        batch_size: int = FETCH_BATCH_SIZE
     ):
         """
         Initialize email client
@@ -24,11 +34,15 @@ class EmailClient:
             app_password: Gmail app password
             imap_server: IMAP server address
             imap_port: IMAP port
+            debug: Print per-email label/filter diagnostics for the first 10 emails checked
+            batch_size: Messages requested per IMAP FETCH round-trip
         """
         self.email_address = email_address
         self.app_password = app_password
         self.imap_server = imap_server
         self.imap_port = imap_port
+        self.debug = debug
+        self.batch_size = max(1, batch_size)
         self.connection = None
 
     def connect(self) -> bool:
@@ -88,7 +102,7 @@ class EmailClient:
             self.connection.select('INBOX')
 
             # Only skip emails with success labels (matched for Amazon, created for Venmo)
-            skip_labels = {'matched', 'created'}
+            skip_labels = (b'matched', b'created')
 
             # Build search criteria
             search_criteria = []
@@ -105,47 +119,74 @@ class EmailClient:
                 search_criteria.append(f'SUBJECT "{subject_contains}"')
             # Note: IMAP TEXT search is not reliable, so we'll filter body content after fetching
 
-            # Get all matching emails first
+            # Get all matching emails first. Gmail drops already-labeled emails server-side (X-GM-RAW),
+            # so their labels never need to be fetched.
             search_string = ' '.join(search_criteria)
-            _, message_numbers = self.connection.search(None, search_string)
-
+            gmail_query = ' '.join(f'-label:{label.decode()}' for label in skip_labels)
+            try:
+                typ, message_numbers = self.connection.search(None, search_string, 'X-GM-RAW', f'"{gmail_query}"')
+            except imaplib.IMAP4.error:
+                typ = None
+
+            debug = self.debug
+            if typ == 'OK':
+                unprocessed = [(num, position) for position, num in enumerate(message_numbers[0].split(), 1)]
+                total_checked = len(unprocessed)
+            else:
+                # Server without X-GM-RAW: search everything and check labels client-side
+                _, message_numbers = self.connection.search(None, search_string)
+
+                # Pass 1: fetch only labels, so already-processed emails are never downloaded
+                unprocessed = []  # (message number, position among checked emails)
+                total_checked = 0
+                for num, fetch_info, _ in self.fetch_messages(message_numbers[0].split(), '(X-GM-LABELS)'):
+                    if b'X-GM-LABELS' not in fetch_info:
+                        continue  # Unsolicited response (e.g. a FLAGS update) for this message
+                    total_checked += 1
+
+                    # Parse labels (Gmail-specific) - extract only the X-GM-LABELS part, as bytes
+                    labels_match = _LABELS_RE.search(fetch_info)
+                    labels = labels_match.group(1) if labels_match else fetch_info
+                    labels_lower = labels.lower()
+
+                    # Debug: print first few to see what we're getting
+                    if debug and total_checked <= 10:
+                        print(f"  Debug: Email {num.decode()}, Labels: {labels.decode(errors='replace')[:200]}")
+
+                    # Check if email has any of the skip labels
+                    skip = False
+                    for skip_label in skip_labels:
+                        if skip_label in labels_lower:
+                            if debug and total_checked <= 10:
+                                print(f"    Skipped (has '{skip_label.decode()}' label)")
+                            skip = True
+                            break
+
+                    if skip:
+                        continue  # Skip this email
+
+                    unprocessed.append((num, total_checked))
+
+            # Pass 2: download full messages for unlabeled emails only
+            # (batched; stops requesting further batches once the limit is reached)
             emails = []
-            total_checked = 0
-            for num in message_numbers[0].split():
-                total_checked += 1
-                # Check if email has any skip labels
-                _, msg_data = self.connection.fetch(num, '(X-GM-LABELS RFC822)')
-
-                # Parse labels (Gmail-specific) - extract only the X-GM-LABELS part
-                labels_str = str(msg_data[0][0])  # Get the first part which contains X-GM-LABELS
-                labels_str_lower = labels_str.lower()
-
-                # Debug: print first few to see what we're getting
-                if total_checked <= 10:
-                    print(f"  Debug: Email {num.decode()}, Labels: {labels_str[:200]}")
-
-                # Check if email has any of the skip labels
-                skip = False
-                for skip_label in skip_labels:
-                    if skip_label in labels_str_lower:
-                        if total_checked <= 10:
-                            print(f"    Skipped (has '{skip_label}' label)")
-                        skip = True
-                        break
-
-                if skip:
-                    continue  # Skip this email
-
-                email_body = msg_data[0][1]
+            check_position = dict(unprocessed)
+            # Case-insensitive keyword search without lowercasing a copy of every body
+            body_contains_re = re.compile(re.escape(body_contains), re.IGNORECASE) if body_contains else None
+            for num, _, email_body in self.fetch_messages([num for num, _ in unprocessed], '(RFC822)'):
+                if email_body is None:
+                    continue  # Unsolicited response (e.g. a FLAGS update), not a message body
+                position = check_position.get(num, total_checked + 1)
+                # compat32 parse: malformed headers (e.g. a bad To address) stay readable strings
                 email_message = email.message_from_bytes(email_body)
 
                 body_text = self._get_email_body(email_message)
 
                 # Filter by body content if specified (for forwarded emails)
-                if body_contains:
-                    if body_contains.lower() not in body_text.lower():
+                if body_contains_re:
+                    if not body_contains_re.search(body_text):
                         # Debug: show why emails are filtered
-                        if total_checked <= 10:
+                        if debug and position <= 10:
                             subject = self._decode_header(email_message['Subject'])
                             print(f"    Skipped (keyword '{body_contains}' not found): {subject[:80]}")
                         continue  # Skip if keyword not found in body
@@ -160,7 +201,7 @@ class EmailClient:
                     'body': body_text
                 })
 
-                if total_checked <= 10:
+                if debug and position <= 10:
                     print(f"    ✓ MATCHED: {subject[:80]}")
 
                 if len(emails) >= limit:
@@ -173,6 +214,39 @@ class EmailClient:
             print(f"Error fetching emails: {e}")
             return []
 
+    def fetch_messages(self, message_numbers: List[bytes], message_parts: str) -> Iterator[Tuple[bytes, bytes, bytes]]:
+        """
+        Fetch messages batch_size at a time (one IMAP round-trip per batch)
+
+        Args:
+            message_numbers: Message sequence numbers from IMAP SEARCH
+            message_parts: FETCH data items, e.g. '(X-GM-LABELS RFC822)'
+
+        Yields:
+            (message number, FETCH response line, message literal or None) for each fetched message
+        """
+        batch_size = self.batch_size
+        for start in range(0, len(message_numbers), batch_size):
+            batch = message_numbers[start:start + batch_size]
+            _, msg_data = self.connection.fetch(b','.join(batch).decode(), message_parts)
+            requested = set(batch)  # Ignore unsolicited responses about other messages
+
+            # A message with a literal (e.g. RFC822) arrives as a (response line, literal) tuple
+            # followed by a closing b')' that may carry data items sent after the literal.
+            # A message without one (e.g. only X-GM-LABELS) arrives as a single bytes line.
+            for i, part in enumerate(msg_data):
+                if isinstance(part, tuple):
+                    fetch_info = part[0]
+                    if i + 1 < len(msg_data) and isinstance(msg_data[i + 1], bytes):
+                        fetch_info += msg_data[i + 1]
+                    num = fetch_info.split(b' ', 1)[0]
+                    if num in requested:
+                        yield num, fetch_info, part[1]
+                elif part and (i == 0 or not isinstance(msg_data[i - 1], tuple)):
+                    num = part.split(b' ', 1)[0]
+                    if num in requested:
+                        yield num, part, None
+
     def mark_as_read(self, email_id: str):
         """Mark an email as read"""
         try:
@@ -196,18 +270,58 @@ class EmailClient:
         except Exception as e:
             print(f"Error labeling email as created: {e}")
 
+    def label_as_matched_batch(self, email_ids: List[str]):
+        """Label several emails as 'matched' with a single IMAP STORE command"""
+        self._add_label_batch(email_ids, 'matched')
+
+    def label_as_created_batch(self, email_ids: List[str]):
+        """Label several emails as 'created' with a single IMAP STORE command"""
+        self._add_label_batch(email_ids, 'created')
+
+    def _add_label_batch(self, email_ids: List[str], label: str):
+        """
+        Add a Gmail label to several emails in one round-trip
+
+        Falls back to labeling each email individually if the batched STORE fails.
+
+        Args:
+            email_ids: Email IDs (message sequence numbers) to label
+            label: Gmail label to add
+        """
+        # Deduplicate (multi-order emails can appear more than once) while preserving order
+        email_ids = list(dict.fromkeys(email_ids))
+        if not email_ids:
+            return
+
+        try:
+            # IMAP STORE accepts a comma-separated message set
+            typ, _ = self.connection.store(','.join(email_ids), '+X-GM-LABELS', label)
+            if typ == 'OK':
+                return
+            print(f"Batch labeling as {label} returned {typ}, retrying per email")
+        except Exception as e:
+            print(f"Error batch labeling emails as {label}: {e}, retrying per email")
+
+        for email_id in email_ids:
+            try:
+                self.connection.store(email_id, '+X-GM-LABELS', label)
+            except Exception as e:
+                print(f"Error labeling email as {label}: {e}")
+
     def _decode_header(self, header: str) -> str:
         """Decode email header"""
         if header is None:
             return ""
-        decoded_parts = decode_header(header)
-        decoded_header = ""
-        for part, encoding in decoded_parts:
+        # No encoded words (the common plain subject): nothing to decode
+        if '=?' not in header:
+            return str(header)
+        decoded_parts = []
+        for part, encoding in decode_header(header):
             if isinstance(part, bytes):
-                decoded_header += part.decode(encoding or 'utf-8', errors='ignore')
+                decoded_parts.append(part.decode(encoding or 'utf-8', errors='ignore'))
             else:
-                decoded_header += part
-        return decoded_header
+                decoded_parts.append(part)
+        return ''.join(decoded_parts)
 
     def _get_email_body(self, email_message) -> str:
         """Extract email body (prefer HTML, fallback to plain text)"""
@@ -217,8 +331,7 @@ class EmailClient:
                 content_type = part.get_content_type()
                 if content_type == "text/html":
                     try:
-                        body = part.get_payload(decode=True).decode('utf-8', errors='ignore')
-                        break
+                        return part.get_payload(decode=True).decode('utf-8', errors='ignore')
                     except:
                         pass
                 elif content_type == "text/plain" and not body:
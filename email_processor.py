@@ -5,6 +5,10 @@ Email Processor - Central coordinator for processing emails from all vendors
 from typing import List, Dict, Optional
 from email_client import EmailClient
 
+# Subject keywords identifying forwarded vendor emails (matched against the lowercased subject)
+# Amazon patterns: orders, shipments, and returns
+_AMAZON_SUBJECT_KEYWORDS = ('ordered:', 'order', 'return request', 'refund', 'drop off', 'dropoff confirmed')
+_VENMO_SUBJECT_KEYWORDS = ('paid you', 'you paid', 'charged you')
 
 class EmailProcessor:
     def __init__(
@@ -45,14 +49,12 @@ class EmailProcessor:
             'amazon', 'venmo', or None if unrecognized
         """
         sender = email_dict.get('from', '').lower()
-        subject = email_dict.get('subject', '')
+        subject_lower = email_dict.get('subject', '').lower()
 
         # Check subject line patterns (for forwarded emails)
-        # Amazon patterns: orders, shipments, and returns
-        amazon_keywords = ['ordered:', 'order', 'return request', 'refund', 'drop off', 'dropoff confirmed']
-        if any(keyword in subject.lower() for keyword in amazon_keywords):
+        if any(keyword in subject_lower for keyword in _AMAZON_SUBJECT_KEYWORDS):
             return 'amazon'
-        elif 'paid you' in subject.lower() or 'you paid' in subject.lower() or 'charged you' in subject.lower():
+        elif any(keyword in subject_lower for keyword in _VENMO_SUBJECT_KEYWORDS):
             return 'venmo'
 
         # Fallback: domain-based classification (for direct emails)
@@ -19,6 +19,9 @@ DEBUG_TRANSACTION_LIMIT = 1000  # Limit number of transactions to process for de
 DATE_BUFFER_DAYS = 10  # Number of days +/- to search for matching transactions
 EMAIL_DAYS_BACK = 30  # Only process emails from the last N days (temporarily increased to reprocess older emails)
 DRY_RUN = False  # When True, run without making any modifications (no email labels, no YNAB updates)
+DEBUG_PARSING = False  # When True, print diagnostic order number/total scans for each Amazon email and per-email IMAP label checks (or set YNABIFY_DEBUG=1)
+PARSE_WORKERS = 1  # Threads used to parse Amazon emails (1 = serial, keeps log output in order)
+VERBOSE = True  # When False, only print one summary line per Amazon transaction (skips detail formatting)
 
 
 def check_required_env_vars() -> bool:
@@ -89,13 +92,16 @@ def main():
     imap_server = os.getenv('EMAIL_IMAP_SERVER', 'imap.gmail.com')
     imap_port = int(os.getenv('EMAIL_IMAP_PORT', 993))
 
+    debug_parsing = DEBUG_PARSING or bool(os.getenv('YNABIFY_DEBUG'))
+
     email_client = None
     if email_address and email_password:
         email_client = EmailClient(
             email_address,
             email_password,
             imap_server,
-            imap_port
+            imap_port,
+            debug=debug_parsing
         )
 
     # Test connections
@@ -136,7 +142,7 @@ def main():
         print("✓ Initialized multi-user support (Cong & Margi)")
 
         # Initialize integrations
-        amazon_integration = AmazonIntegration(ynab_client, email_client, user_detector=user_detector, date_buffer_days=DATE_BUFFER_DAYS, dry_run=DRY_RUN, category_classifier=category_classifier)
+        amazon_integration = AmazonIntegration(ynab_client, email_client, user_detector=user_detector, date_buffer_days=DATE_BUFFER_DAYS, dry_run=DRY_RUN, category_classifier=category_classifier, debug=debug_parsing, parse_workers=PARSE_WORKERS, verbose=VERBOSE)
         venmo_integration = VenmoIntegration(ynab_client, email_client, user_detector=user_detector, dry_run=DRY_RUN, category_classifier=category_classifier)
 
         # Initialize email processor with integrations
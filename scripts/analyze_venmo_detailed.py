@@ -8,72 +8,67 @@ import re
 from dotenv import load_dotenv
 from email_client import EmailClient
 import email
-from email.header import decode_header
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from amazon_integration import HTML_PARSER
 
 load_dotenv()
 
+# Only the tags inspected below are built into the tree (links and text containers)
+PARSE_ONLY = SoupStrainer(['a', 'div', 'span', 'p', 'td'])
+
 # Initialize Email client
 email_address = os.getenv('EMAIL_ADDRESS')
 email_password = os.getenv('EMAIL_APP_PASSWORD')
 imap_server = os.getenv('EMAIL_IMAP_SERVER', 'imap.gmail.com')
 imap_port = int(os.getenv('EMAIL_IMAP_PORT', 993))
 
-email_client = EmailClient(email_address, email_password, imap_server, imap_port)
+# Small FETCH batches: each batch's full messages are held in memory while they're printed
+email_client = EmailClient(email_address, email_password, imap_server, imap_port, batch_size=10)
 
-if email_client.connect():
-    print("=== Detailed Venmo Email Analysis ===\n")
 
-    email_client.connection.select('INBOX')
-    _, message_numbers = email_client.connection.search(None, 'ALL')
+def iter_venmo_emails(client):
+    """
+    Stream Venmo transaction emails from the inbox one at a time
 
-    venmo_transaction_emails = []
+    Args:
+        client: Connected EmailClient
 
-    for num in message_numbers[0].split():
-        _, msg_data = email_client.connection.fetch(num, '(RFC822)')
-        email_body = msg_data[0][1]
+    Yields:
+        Dict with subject, date, and body_html for each transaction (paid/received) email
+    """
+    client.connection.select('INBOX')
+    # Let the server filter to Venmo payment emails instead of downloading the whole inbox
+    _, message_numbers = client.connection.search(None, '(FROM "venmo.com" SUBJECT "paid")')
+
+    for _, _, email_body in client.fetch_messages(message_numbers[0].split(), '(RFC822)'):
+        if email_body is None:
+            continue  # Unsolicited response (e.g. a FLAGS update), not a message body
         email_message = email.message_from_bytes(email_body)
 
         sender = email_message['From']
         if sender and '@venmo.com' in sender.lower():
             subject = email_message['Subject']
-            if subject:
-                decoded_parts = decode_header(subject)
-                decoded_subject = ""
-                for part, encoding in decoded_parts:
-                    if isinstance(part, bytes):
-                        decoded_subject += part.decode(encoding or 'utf-8', errors='ignore')
-                    else:
-                        decoded_subject += part
-            else:
-                decoded_subject = "(No subject)"
+            decoded_subject = client._decode_header(subject) if subject else "(No subject)"
 
             # Only transaction emails (paid/received)
             if 'paid' in decoded_subject.lower():
-                # Get full email body
-                body = ""
-                if email_message.is_multipart():
-                    for part in email_message.walk():
-                        if part.get_content_type() == "text/html":
-                            body = part.get_payload(decode=True).decode('utf-8', errors='ignore')
-                            break
-                        elif part.get_content_type() == "text/plain" and not body:
-                            body = part.get_payload(decode=True).decode('utf-8', errors='ignore')
-                else:
-                    body = email_message.get_payload(decode=True).decode('utf-8', errors='ignore')
-
-                venmo_transaction_emails.append({
+                # Get full email body (HTML preferred, plain text otherwise; same lookup as the main run)
+                body = client._get_email_body(email_message)
+
+                yield {
                     'subject': decoded_subject,
                     'date': email_message['Date'],
                     'body_html': body
-                })
+                }
 
-    email_client.disconnect()
 
-    print(f"Found {len(venmo_transaction_emails)} Venmo transaction emails\n")
+if email_client.connect():
+    print("=== Detailed Venmo Email Analysis ===\n")
     print("=" * 100)
 
-    for idx, email_info in enumerate(venmo_transaction_emails, 1):
+    # Print each email as it arrives, so at most one FETCH batch (batch_size messages) is held in memory
+    idx = 0
+    for idx, email_info in enumerate(iter_venmo_emails(email_client), 1):
         print(f"\n{'=' * 100}")
         print(f"EMAIL #{idx}")
         print(f"{'=' * 100}")
@@ -82,8 +77,8 @@ if email_client.connect():
         print(f"\nHTML Body Structure:")
         print("-" * 100)
 
-        # Parse HTML
-        soup = BeautifulSoup(email_info['body_html'], 'html.parser')
+        # Parse HTML once; the text dump, link list and note search below all reuse this soup
+        soup = BeautifulSoup(email_info['body_html'], HTML_PARSER, parse_only=PARSE_ONLY)
 
         # Show all text content
         print("\nAll Text Content:")
@@ -111,5 +106,9 @@ if email_client.connect():
                 if text not in ['You paid', 'paid you', 'View Transaction', 'Download the app']:
                     print(f"  - {text}")
 
+    email_client.disconnect()
+
+    print(f"\nFound {idx} Venmo transaction emails")
+
 else:
     print("Failed to connect to email")
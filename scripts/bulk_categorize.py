@@ -18,6 +18,7 @@ Options:
 """
 
 import os
+import re
 import sys
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
@@ -94,6 +95,8 @@ def bulk_categorize_transactions(
 
     print(f"\n🔍 Processing transactions...\n")
 
+    # Collect transactions to classify (classified together below)
+    candidates = []
     for txn in transactions:
         stats['processed'] += 1
 
@@ -113,7 +116,6 @@ def bulk_categorize_transactions(
         text = None
         if txn.payee_name and 'amazon' in txn.payee_name.lower() and txn.memo:
             # Extract item name from memo (text before "Amazon Link:")
-            import re
             match = re.match(r'(.+?)(?:\s*Amazon Link:|\s*RETURN:|\.\.\.$)', txn.memo)
             if match:
                 item_name = match.group(1).strip()
@@ -128,10 +130,29 @@ def bulk_categorize_transactions(
             stats['no_match'] += 1
             continue
 
-        # Classify using generic classification
+        candidates.append((txn, text))
+
+    # Classify using generic classification (rule misses go to the LLM in batches)
+    try:
+        category_ids = category_classifier.classify_generic_transactions(
+            [(text, txn.amount) for txn, text in candidates]
+        )
+    except Exception as e:
+        print(f"  ✗ Batch classification failed ({e}), classifying one at a time")
+        classified_candidates = []
+        category_ids = []
+        for txn, text in candidates:
+            try:
+                category_ids.append(category_classifier.classify_generic_transaction(text, amount=txn.amount))
+            except Exception as e:
+                print(f"  ✗ Error processing transaction {txn.id}: {e}")
+                stats['errors'] += 1
+                continue  # Error counted; skip this transaction
+            classified_candidates.append((txn, text))
+        candidates = classified_candidates
+
+    for (txn, text), category_id in zip(candidates, category_ids):
         try:
-            category_id = category_classifier.classify_generic_transaction(text, amount=txn.amount)
-
             if category_id:
                 stats['classified'] += 1
 
@@ -5,8 +5,14 @@ Venmo Integration - Parse Venmo emails and create YNAB transactions
 import re
 from typing import Dict, List, Optional
 from datetime import datetime
+from email.utils import parsedate_to_datetime
 from bs4 import BeautifulSoup
 
+# Precompiled patterns used by parse_email
+_SENT_SUBJECT_RE = re.compile(r'You paid\s+(.+?)\s+\$?([\d,]+\.\d{2})', re.IGNORECASE)
+_RECEIVED_SUBJECT_RE = re.compile(r'(.+?)\s+paid you\s+\$?([\d,]+\.\d{2})', re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r'\s+')
+
 
 class VenmoIntegration:
     def __init__(self, ynab_client, email_client, user_detector=None, dry_run=False, category_classifier=None):
@@ -55,8 +61,8 @@ class VenmoIntegration:
                 return None
 
             # Parse subject line: "You paid NAME $AMOUNT" or "NAME paid you $AMOUNT"
-            sent_match = re.search(r'You paid\s+(.+?)\s+\$?([\d,]+\.\d{2})', subject, re.IGNORECASE)
-            received_match = re.search(r'(.+?)\s+paid you\s+\$?([\d,]+\.\d{2})', subject, re.IGNORECASE)
+            sent_match = _SENT_SUBJECT_RE.search(subject)
+            received_match = _RECEIVED_SUBJECT_RE.search(subject)
 
             if sent_match:
                 name = sent_match.group(1).strip()
@@ -77,6 +83,7 @@ class VenmoIntegration:
 
             # Look for text between amount and "See transaction"
             # Include / to handle dates like "1/14 cleaning"
+            # (depends on the amount, so it's built per email; re's pattern cache reuses repeats)
             description_pattern = rf'\$\s*{amount:.2f}.*?([A-Za-z0-9\s,\.\-\'"/]+?)\s*See transaction'
             desc_match = re.search(description_pattern, text, re.IGNORECASE | re.DOTALL)
 
@@ -84,19 +91,16 @@ class VenmoIntegration:
             if desc_match:
                 desc_text = desc_match.group(1).strip()
                 # Clean up: remove extra whitespace and common UI text
-                desc_text = re.sub(r'\s+', ' ', desc_text)
+                desc_text = _WHITESPACE_RE.sub(' ', desc_text)
                 # Filter out UI elements
                 if desc_text and desc_text.lower() not in ['you paid', 'paid you'] and len(desc_text) > 2:
                     description = desc_text
 
             # Extract date from email date header
             try:
-                date_str = email_dict['date']
                 # Parse format: "Sat, 6 Dec 2025 04:23:26 +0000"
-                # Remove day name and timezone
-                date_part = date_str.split(',')[1].strip()  # " 6 Dec 2025 04:23:26 +0000"
-                date_without_tz = date_part.rsplit(' ', 1)[0]  # Remove timezone: "6 Dec 2025 04:23:26"
-                transaction_date = datetime.strptime(date_without_tz, '%d %b %Y %H:%M:%S')
+                # Keep the wall-clock time as written and drop the timezone
+                transaction_date = parsedate_to_datetime(email_dict['date']).replace(tzinfo=None)
             except Exception as e:
                 print(f"  Warning: Could not parse date '{email_dict.get('date')}', using today: {e}")
                 transaction_date = datetime.now()
@@ -187,6 +191,7 @@ class VenmoIntegration:
 
         print(f"\nVenmo Transactions ({len(transactions)}):")
         created_transactions = []
+        created_email_ids = []  # Labeled 'created' in one batch after the loop
 
         for txn in transactions:
             date_str = txn['date'].strftime('%Y-%m-%d')
@@ -206,8 +211,8 @@ class VenmoIntegration:
                 if self.dry_run:
                     print(f"    [DRY RUN] Would mark email as created")
                 else:
-                    self.email_client.label_as_created(txn['email_id'])
-                    print(f"    ✓ Marked email as created")
+                    created_email_ids.append(txn['email_id'])
+                    print(f"    ✓ Will mark email as created")
                 continue
 
             # Classify transaction if classifier is available
@@ -239,12 +244,16 @@ class VenmoIntegration:
                 success = self._create_ynab_transaction(txn)
                 if success:
                     created_transactions.append(txn)
-                    self.email_client.label_as_created(txn['email_id'])
+                    created_email_ids.append(txn['email_id'])
                     print(f"    ✓ Created YNAB transaction")
-                    print(f"    ✓ Marked email as created (will retry until created)")
                 else:
                     print(f"    ✗ Failed to create YNAB transaction (will retry next run)")
 
+        # Apply the 'created' label to all handled emails in one IMAP round-trip
+        if created_email_ids:
+            self.email_client.label_as_created_batch(created_email_ids)
+            print(f"  ✓ Marked {len(set(created_email_ids))} email(s) as created (unlabeled emails retry next run)")
+
         return created_transactions
 
     def _check_duplicate(self, venmo_txn: Dict, ynab_transactions: List) -> bool:
@@ -266,9 +275,9 @@ class VenmoIntegration:
 
         # Convert to YNAB milliunits
         if venmo_txn['is_received']:
-            venmo_amount_milliunits = int(venmo_amount * 1000)  # Positive for inflow
+            venmo_amount_milliunits = round(venmo_amount * 1000)  # Positive for inflow
         else:
-            venmo_amount_milliunits = int(-venmo_amount * 1000)  # Negative for outflow
+            venmo_amount_milliunits = round(-venmo_amount * 1000)  # Negative for outflow
 
         # Define date range (±1 day)
         date_min = venmo_date - timedelta(days=1)
@@ -309,9 +318,9 @@ class VenmoIntegration:
         try:
             # Convert amount to YNAB milliunits
             if venmo_txn['is_received']:
-                amount_milliunits = int(venmo_txn['amount'] * 1000)  # Positive for inflow
+                amount_milliunits = round(venmo_txn['amount'] * 1000)  # Positive for inflow
             else:
-                amount_milliunits = int(-venmo_txn['amount'] * 1000)  # Negative for outflow
+                amount_milliunits = round(-venmo_txn['amount'] * 1000)  # Negative for outflow
 
             # Format date as YYYY-MM-DD
             date_str = venmo_txn['date'].strftime('%Y-%m-%d')
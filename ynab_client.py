@@ -23,6 +23,7 @@ class YNABClient:
         self.transactions_api = self.client.transactions
         self.categories_api = self.client.categories
         self.accounts_api = self.client.accounts
+        self._category_groups = None  # Cache: category groups (shared by every classifier using this client)
 
     def get_transactions(self, since_date: Optional[str] = None) -> List:
         """
@@ -213,14 +214,18 @@ class YNABClient:
 
     def get_categories(self) -> List:
         """
-        Get all budget categories
+        Get all budget categories (fetched once per client, then served from cache)
 
         Returns:
             List of category objects
         """
+        if self._category_groups:
+            return self._category_groups
+
         try:
             response = self.categories_api.get_categories(self.budget_id)
-            return response.data.category_groups
+            self._category_groups = response.data.category_groups
+            return self._category_groups
         except Exception as e:
             print(f"Error fetching categories: {e}")
             return []